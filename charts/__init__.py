@@ -1 +1,8 @@
 # Charts module for Steam Game Analytics Dashboard
+import plotly.io as pio
+
+# Serialize every figure (st.plotly_chart) with orjson instead of the stdlib json encoder.
+# orjson writes NumPy arrays natively; the float32 casts in the chart modules only make
+# those numbers shorter (single precision) in the JSON. plotly 5 sends plain number
+# lists either way (base64 typed arrays need plotly 6).
+pio.json.config.default_engine = "orjson"
@@ -1,38 +1,51 @@
 import streamlit as st
 import pandas as pd
 import plotly.graph_objects as go
+import numpy as np
 import mysql.connector
 from mysql.connector import Error
+from db_connection import cache_by_run_date, fetch_dataframe
 
 
-@st.cache_data(ttl=300)  # Cache for 5 minutes
-def fetch_developer_performance_data(_connection, run_date):
-    """Fetch developer performance metrics for a specific date."""
-    try:
-        query = """
+@cache_by_run_date
+def _fetch_developer_performance_data(_connection, run_date):
+    # Pre-aggregated per run_date by sql/mv_developer_daily.sql.
+    # Market shares are relative to the top 20 developers shown.
+    query = """
+    SELECT
+        developer,
+        total_players,
+        game_count,
+        avg_price,
+        avg_sentiment,
+        ROUND(total_players * 100 / SUM(total_players) OVER (), 1) as market_share,
+        ROUND(
+            SUM(total_players) OVER (ORDER BY total_players DESC, developer ROWS UNBOUNDED PRECEDING) * 100 /
+            SUM(total_players) OVER (),
+            1
+        ) as cumulative_share
+    FROM (
         SELECT
-            CASE 
-                WHEN gc.appid = 1938090 THEN 'Infinity Ward'
-                ELSE gc.developer
-            END as developer,
-            SUM(g.current_players) as total_players,
-            COUNT(DISTINCT gc.appid) as game_count,
-            ROUND(AVG(gc.price), 2) as avg_price,
-            COUNT(DISTINCT gc.appid) as unique_games,
-            ROUND(SUM(g.positive_reviews) / (SUM(g.positive_reviews) + SUM(g.negative_reviews)) * 100, 1) as avg_sentiment
-        FROM game_catalog gc
-        LEFT JOIN games_cleaned g ON gc.appid = g.appid AND g.run_date = %s
-        WHERE gc.developer IS NOT NULL AND gc.developer != ''
-        GROUP BY CASE 
-                    WHEN gc.appid = 1938090 THEN 'Infinity Ward'
-                    ELSE gc.developer
-                 END
-        HAVING SUM(g.current_players) > 0
-        ORDER BY total_players DESC
+            developer,
+            total_players,
+            game_count,
+            avg_price,
+            ROUND(positive_sum / (positive_sum + negative_sum) * 100, 1) as avg_sentiment
+        FROM mv_developer_daily
+        WHERE run_date = %s
+        ORDER BY total_players DESC, developer
         LIMIT 20
-        """
-        result = pd.read_sql(query, _connection, params=(run_date,))
-        return result
+    ) top_developers
+    ORDER BY total_players DESC, developer
+    """
+    result = fetch_dataframe(_connection, query, (run_date,), categories=('developer',))
+    return result
+
+
+def fetch_developer_performance_data(connection, run_date):
+    """Fetch developer performance metrics for a specific date."""
+    try:
+        return _fetch_developer_performance_data(connection, run_date)
     except Error as e:
         st.error(f"Error fetching developer performance data: {e}")
         return pd.DataFrame()
@@ -58,10 +71,6 @@ def show_developer_performance(connection, selected_date):
     st.markdown(f"**📅 Date:** {selected_date.strftime('%Y-%m-%d')}")
     st.markdown("---")
     
-    # Calculate market metrics
-    total_market_players = data['total_players'].sum()
-    data['market_share'] = (data['total_players'] / total_market_players * 100).round(1)
-    
     # Fill None values in avg_price to prevent color mapping errors
     data['avg_price'] = data['avg_price'].fillna(0)
     
@@ -92,25 +101,35 @@ def show_developer_performance(connection, selected_date):
     # ===== BAR CHART SECTION =====
     st.header("🏢 Developer Performance Ranking")
     
+    players_k = data['total_players'].to_numpy(dtype=np.float32) / 1000  # Convert to thousands
+    avg_price = data['avg_price'].to_numpy(dtype=np.float32)
+    
+    # Bar labels and hover are formatted by Plotly.js from (players K, market share %)
+    bar_data = np.column_stack([
+        np.floor(players_k),
+        data['market_share'].to_numpy(dtype=np.float32)
+    ])
+    
     # Create horizontal bar chart
     fig = go.Figure()
     
     fig.add_trace(go.Bar(
         y=data['developer'],
-        x=data['total_players'] / 1000,  # Convert to thousands
+        x=players_k,
         orientation='h',
         marker=dict(
-            color=data['avg_price'],
+            color=avg_price,
             colorscale='Viridis',
             showscale=True,
             colorbar=dict(title="Avg Price ($)"),
             line=dict(width=1, color='white')
         ),
-        text=[f"{int(p/1000):,}K ({s:.1f}%)" for p, s in zip(data['total_players'], data['market_share'])],
+        customdata=bar_data,
+        texttemplate='%{customdata[0]:,.0f}K (%{customdata[1]:.1f}%)',
         textposition='outside',
         hovertemplate='<b>%{y}</b><br>' +
                      'Total Players: %{x:,.0f}K<br>' +
-                     'Market Share: <extra></extra>',
+                     'Market Share: %{customdata[1]:.1f}%<extra></extra>',
         name='Players'
     ))
     
@@ -163,18 +182,30 @@ def show_developer_performance(connection, selected_date):
     
     st.markdown("---")
     
+    # Build the table frame once; both tables show slices of it.
+    # Numeric columns stay numeric; Streamlit labels and formats them in the browser.
+    display = data[['developer', 'total_players', 'game_count', 'avg_price', 'market_share', 'avg_sentiment']].assign(
+        total_players=data['total_players'] // 1000
+    )
+    table_column_config = {
+        'developer': st.column_config.TextColumn("Developer"),
+        'total_players': st.column_config.NumberColumn("Total Players", format="%dK"),
+        'game_count': st.column_config.NumberColumn("Games Published"),
+        'avg_price': st.column_config.NumberColumn("Avg Price", format="$%.2f"),
+        'market_share': st.column_config.NumberColumn("Market Share %", format="%.1f%%"),
+        'avg_sentiment': st.column_config.NumberColumn("Avg Sentiment %", format="%.1f%%")
+    }
+    
     # Market leaders section
     st.subheader("👑 Market Leaders (Top 5)")
     st.caption("Developers with the largest player bases and market dominance")
     
-    leaders = data.head(5)[['developer', 'total_players', 'game_count', 'avg_price', 'market_share', 'avg_sentiment']].copy()
-    leaders.columns = ['Developer', 'Total Players', 'Games', 'Avg Price', 'Market Share %', 'Avg Sentiment %']
-    leaders['Total Players'] = leaders['Total Players'].apply(lambda x: f"{int(x/1000):,}K")
-    leaders['Avg Price'] = leaders['Avg Price'].apply(lambda x: f"${x:.2f}")
-    leaders['Market Share %'] = leaders['Market Share %'].apply(lambda x: f"{x:.1f}%")
-    leaders['Avg Sentiment %'] = leaders['Avg Sentiment %'].apply(lambda x: f"{x:.1f}%" if pd.notna(x) else "N/A")
-    
-    st.dataframe(leaders, use_container_width=True, hide_index=True)
+    st.dataframe(
+        display.head(5),
+        use_container_width=True,
+        hide_index=True,
+        column_config={**table_column_config, 'game_count': st.column_config.NumberColumn("Games")}
+    )
     
     st.markdown("---")
     
@@ -182,14 +213,7 @@ def show_developer_performance(connection, selected_date):
     st.subheader("📋 Detailed Developer Comparison")
     st.caption("Full metrics for all analyzed developers - sorted by player count")
     
-    comparison = data[['developer', 'total_players', 'game_count', 'avg_price', 'market_share', 'avg_sentiment']].copy()
-    comparison.columns = ['Developer', 'Total Players', 'Games Published', 'Avg Price', 'Market Share %', 'Avg Sentiment %']
-    comparison['Total Players'] = comparison['Total Players'].apply(lambda x: f"{int(x/1000):,}K")
-    comparison['Avg Price'] = comparison['Avg Price'].apply(lambda x: f"${x:.2f}")
-    comparison['Market Share %'] = comparison['Market Share %'].apply(lambda x: f"{x:.1f}%")
-    comparison['Avg Sentiment %'] = comparison['Avg Sentiment %'].apply(lambda x: f"{x:.1f}%" if pd.notna(x) else "N/A")
-    
-    st.dataframe(comparison, use_container_width=True, hide_index=True)
+    st.dataframe(display, use_container_width=True, hide_index=True, column_config=table_column_config)
     
     st.markdown("---")
     
@@ -199,10 +223,9 @@ def show_developer_performance(connection, selected_date):
     col1, col2 = st.columns(2)
     
     with col1:
-        concentration_data = data.head(10)[['developer', 'market_share']].copy()
         fig_pie = go.Figure(data=[go.Pie(
-            labels=concentration_data['developer'],
-            values=concentration_data['market_share'],
+            labels=data['developer'].head(10),
+            values=data['market_share'].head(10).to_numpy(dtype=np.float32),
             hole=0.3,
             hovertemplate='<b>%{label}</b><br>Market Share: %{value:.1f}%<extra></extra>'
         )])
@@ -215,7 +238,7 @@ def show_developer_performance(connection, selected_date):
     
     with col2:
         # Cumulative market share
-        cumulative_share = data['market_share'].cumsum().head(10)
+        cumulative_share = data['cumulative_share'].head(10).to_numpy(dtype=np.float32)
         fig_cumsum = go.Figure()
         fig_cumsum.add_trace(go.Scatter(
             y=data['developer'].head(10),
@@ -0,0 +1,50 @@
+import numpy as np
+
+
+def lttb_indices(x, y, n_out):
+    """
+    Pick the row positions to keep when downsampling a line series to n_out points.
+
+    Uses Largest-Triangle-Three-Buckets (LTTB): the first and last points are kept,
+    and from each of the n_out - 2 buckets in between the point forming the largest
+    triangle with the previously kept point and the next bucket's average is chosen.
+    This preserves peaks and dips far better than taking every k-th row.
+
+    Args:
+        x: Numeric, increasing x values (e.g. datetime64 viewed as int64)
+        y: Numeric y values, same length as x
+        n_out: Number of points to keep
+
+    Returns:
+        Sorted int64 array of positions into x/y
+    """
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+    n = len(x)
+    if n_out >= n or n_out < 3:
+        return np.arange(n)
+
+    indices = np.empty(n_out, dtype=np.int64)
+    indices[0] = 0
+    indices[-1] = n - 1
+
+    every = (n - 2) / (n_out - 2)
+    a = 0
+    for i in range(n_out - 2):
+        # Average of the next bucket (the last point for the final bucket)
+        avg_start = int(np.floor((i + 1) * every)) + 1
+        avg_end = min(int(np.floor((i + 2) * every)) + 1, n)
+        avg_x = x[avg_start:avg_end].mean()
+        avg_y = y[avg_start:avg_end].mean()
+
+        # Current bucket: keep the point with the largest triangle area
+        range_start = int(np.floor(i * every)) + 1
+        range_end = int(np.floor((i + 1) * every)) + 1
+        area = np.abs(
+            (x[a] - avg_x) * (y[range_start:range_end] - y[a]) -
+            (x[a] - x[range_start:range_end]) * (avg_y - y[a])
+        )
+        a = range_start + int(np.argmax(np.nan_to_num(area, nan=-1.0)))
+        indices[i + 1] = a
+
+    return indices
@@ -1,100 +1,186 @@
 import streamlit as st
 import pandas as pd
 import plotly.graph_objects as go
+import numpy as np
 import mysql.connector
 from mysql.connector import Error
-from datetime import datetime, timedelta
+from datetime import date, datetime, timedelta
+from db_connection import cache_by_run_date, fetch_dataframe
 
 
-@st.cache_data(ttl=300)  # Cache for 5 minutes
-def fetch_top_trending_games_data(_connection, run_date, limit=20):
+@cache_by_run_date
+def _fetch_top_trending_games_data(_connection, run_date, limit=20):
+    query = """
+    SELECT
+        appid,
+        name,
+        ROUND(AVG(current_players) / 1000) AS avg_players_k,
+        ROUND(AVG(positive_reviews) / 1000) AS avg_positive_reviews_k,
+        ROUND(AVG(negative_reviews) / 1000) AS avg_negative_reviews_k,
+        MAX(price_usd) AS max_price_usd
+    FROM games_cleaned
+    WHERE run_date = %s
+    GROUP BY appid, name
+    ORDER BY avg_players_k DESC
+    LIMIT %s;
+    """
+    result = fetch_dataframe(_connection, query, (run_date, limit), categories=('name',))
+    return result
+
+
+def fetch_top_trending_games_data(connection, run_date, limit=20):
     """Fetch top trending games for a specific date."""
     try:
-        query = """
-        SELECT
-            appid,
-            name,
-            ROUND(AVG(current_players) / 1000) AS avg_players_k,
-            ROUND(AVG(positive_reviews) / 1000) AS avg_positive_reviews_k,
-            ROUND(AVG(negative_reviews) / 1000) AS avg_negative_reviews_k,
-            MAX(price_usd) AS max_price_usd
-        FROM games_cleaned
-        WHERE run_date = %s
-        GROUP BY appid, name
-        ORDER BY avg_players_k DESC
-        LIMIT %s;
-        """
-        result = pd.read_sql(query, _connection, params=(run_date, limit))
-        return result
+        return _fetch_top_trending_games_data(connection, run_date, limit)
     except Error as e:
         st.error(f"Error fetching trending games: {e}")
         return pd.DataFrame()
 
 
-@st.cache_data(ttl=300)  # Cache for 5 minutes
-def fetch_top_100_hourly(_connection, run_date, run_hour):
+@cache_by_run_date
+def _fetch_top_100_hourly(_connection, run_date, run_hour):
+    query = """
+    SELECT DISTINCT appid, name
+    FROM trending_games
+    WHERE run_date = %s AND run_hour = %s
+    LIMIT 100
+    """
+    result = fetch_dataframe(_connection, query, (run_date, run_hour))
+    return set(result['appid'].tolist()) if not result.empty else set()
+
+
+def fetch_top_100_hourly(connection, run_date, run_hour):
     """Fetch top 100 games for a specific hour."""
     try:
-        query = """
-        SELECT DISTINCT appid, name
-        FROM trending_games
-        WHERE run_date = %s AND run_hour = %s
-        LIMIT 100
-        """
-        result = pd.read_sql(query, _connection, params=(run_date, run_hour))
-        return set(result['appid'].tolist()) if not result.empty else set()
+        return _fetch_top_100_hourly(connection, run_date, run_hour)
     except Error as e:
         st.error(f"Error fetching top 100 hourly games: {e}")
         return set()
 
 
-@st.cache_data(ttl=300)  # Cache for 5 minutes
-def fetch_top_100_movement_data(_connection, run_date, run_hour):
-    """Fetch movement analysis for top 100 games between current and previous hour."""
+@cache_by_run_date
+def _fetch_top_100_movement_data(_connection, run_date, run_hour):
+    # Previous hour's slot
+    prev_hour = run_hour - 1
+    prev_date = run_date
+
+    if prev_hour < 0:
+        # If hour is 0, get previous day's hour 23 (kept as a date so it binds as DATE)
+        prev_hour = 23
+        if isinstance(run_date, date):
+            prev_date = run_date - timedelta(days=1)
+        else:
+            prev_date = datetime.strptime(str(run_date), '%Y-%m-%d').date() - timedelta(days=1)
+
+    # Current and previous hour's top 100 in one round-trip
+    query = """
+    (SELECT DISTINCT 'current' AS bucket, appid, name
+     FROM trending_games
+     WHERE run_date = %s AND run_hour = %s
+     LIMIT 100)
+    UNION ALL
+    (SELECT DISTINCT 'previous' AS bucket, appid, name
+     FROM trending_games
+     WHERE run_date = %s AND run_hour = %s
+     LIMIT 100)
+    """
+    result = fetch_dataframe(
+        _connection, query, (run_date, run_hour, prev_date, prev_hour), categories=('bucket', 'name')
+    )
+    is_current = result['bucket'] == 'current'
+    current_result = result.loc[is_current, ['appid', 'name']].reset_index(drop=True)
+    prev_result = result.loc[~is_current, ['appid', 'name']].reset_index(drop=True)
+
+    current_appids = current_result['appid'].to_numpy(dtype=np.int64)
+    prev_appids = prev_result['appid'].to_numpy(dtype=np.int64)
+
+    # Categorize movements (set semantics: duplicate appids collapse, as in the hourly set)
+    rising = np.setdiff1d(current_appids, prev_appids)  # New entries
+    holding = np.intersect1d(current_appids, prev_appids)  # Stayers
+    falling = np.setdiff1d(prev_appids, current_appids)  # Removals
+
+    return {
+        'rising': rising,
+        'holding': holding,
+        'falling': falling,
+        'current_df': current_result,
+        'prev_df': prev_result
+    }
+
+
+def fetch_top_100_movement_data(connection, run_date, run_hour):
+    """
+    Fetch movement analysis for top 100 games between current and previous hour.
+    Rising/holding/falling are sorted int64 arrays of appids.
+    """
     try:
-        # Get current hour's top 100
-        current_query = """
-        SELECT appid, name
-        FROM trending_games
-        WHERE run_date = %s AND run_hour = %s
-        LIMIT 100
-        """
-        current_result = pd.read_sql(current_query, _connection, params=(run_date, run_hour))
-        current_appids = set(current_result['appid'].tolist()) if not current_result.empty else set()
-        
-        # Get previous hour's top 100
-        prev_hour = run_hour - 1
-        prev_date = run_date
-        
-        if prev_hour < 0:
-            # If hour is 0, get previous day's hour 23
-            prev_hour = 23
-            prev_date = (datetime.strptime(str(run_date), '%Y-%m-%d') - timedelta(days=1)).strftime('%Y-%m-%d')
-        
-        prev_query = """
-        SELECT appid, name
-        FROM trending_games
-        WHERE run_date = %s AND run_hour = %s
-        LIMIT 100
-        """
-        prev_result = pd.read_sql(prev_query, _connection, params=(prev_date, prev_hour))
-        prev_appids = set(prev_result['appid'].tolist()) if not prev_result.empty else set()
-        
-        # Categorize movements
-        rising = current_appids - prev_appids  # New entries
-        holding = current_appids & prev_appids  # Stayers
-        falling = prev_appids - current_appids  # Removals
-        
-        return {
-            'rising': rising,
-            'holding': holding,
-            'falling': falling,
-            'current_df': current_result,
-            'prev_df': prev_result
-        }
+        return _fetch_top_100_movement_data(connection, run_date, run_hour)
     except Error as e:
         st.error(f"Error fetching movement data: {e}")
-        return {'rising': set(), 'holding': set(), 'falling': set(), 'current_df': pd.DataFrame(), 'prev_df': pd.DataFrame()}
+        no_appids = np.empty(0, dtype=np.int64)
+        return {'rising': no_appids, 'holding': no_appids, 'falling': no_appids, 'current_df': pd.DataFrame(), 'prev_df': pd.DataFrame()}
+
+
+@cache_by_run_date
+def _fetch_game_momentum_data(_connection, run_date, morning_start, morning_end, afternoon_start, afternoon_end):
+    # Single scan with conditional averages per window (no self-join)
+    query = """
+    SELECT
+        appid,
+        MAX(name) as name,
+        AVG(CASE WHEN run_hour BETWEEN %s AND %s THEN median_playtime_2weeks END) as avg_morning,
+        COALESCE(AVG(CASE WHEN run_hour BETWEEN %s AND %s THEN median_playtime_2weeks END), 0) as avg_afternoon,
+        AVG(CASE WHEN run_hour BETWEEN %s AND %s THEN median_playtime_2weeks END) -
+        AVG(CASE WHEN run_hour BETWEEN %s AND %s THEN median_playtime_2weeks END) as delta
+    FROM games_cleaned
+    WHERE run_date = %s AND run_hour BETWEEN %s AND %s
+    GROUP BY appid
+    HAVING avg_morning IS NOT NULL
+    ORDER BY delta DESC
+    """
+    params = (
+        morning_start, morning_end,
+        afternoon_start, afternoon_end,
+        afternoon_start, afternoon_end,
+        morning_start, morning_end,
+        run_date, morning_start, afternoon_end
+    )
+
+    # # Debug: Print rendered query
+    # rendered_query = query % tuple(map(str, params))
+    # with st.expander("📝 Debug: SQL Query"):
+    #     st.code(rendered_query, language="sql")
+
+    result = fetch_dataframe(_connection, query, params, categories=('name',))
+    return result
+
+
+def fetch_game_momentum_data(connection, run_date, morning_start, morning_end, afternoon_start, afternoon_end):
+    """Fetch average median playtime per game for a morning and an afternoon window."""
+    try:
+        return _fetch_game_momentum_data(connection, run_date, morning_start, morning_end, afternoon_start, afternoon_end)
+    except Error as e:
+        st.error(f"Error fetching momentum data: {e}")
+        return pd.DataFrame()
+
+
+def _render_momentum_tab(games, delta_format, empty_message):
+    """Render one momentum tab from an already-sliced frame of classified games."""
+    if games.empty:
+        st.info(empty_message)
+        return
+    
+    st.dataframe(
+        games[['name', 'avg_morning', 'avg_afternoon', 'delta']],
+        use_container_width=True,
+        hide_index=True,
+        column_config={
+            'name': st.column_config.TextColumn("Game Name"),
+            'avg_morning': st.column_config.NumberColumn("Morning (1-12h)", format="%d"),
+            'avg_afternoon': st.column_config.NumberColumn("Afternoon (13-23h)", format="%d"),
+            'delta': st.column_config.NumberColumn("Delta", format=delta_format)
+        }
+    )
 
 
 def show_top_trending_games(connection, selected_date, top_n=20):
@@ -124,18 +210,21 @@ def show_top_trending_games(connection, selected_date, top_n=20):
     # ===== CHART SECTION =====
     st.header("🔥 Top Trending Games")
     
+    avg_players_k = games_data['avg_players_k'].to_numpy(dtype=np.float32)
+    
     # Create bar chart
     fig = go.Figure(data=[
         go.Bar(
             x=games_data['name'],
-            y=games_data['avg_players_k'],
+            y=avg_players_k,
             marker=dict(
-                color=games_data['avg_players_k'],
+                color=avg_players_k,
                 colorscale='Viridis',
                 showscale=True,
                 colorbar=dict(title="Avg Players (K)")
             ),
-            text=games_data['avg_players_k'].apply(lambda x: f"{int(x):,}K"),
+            text=np.floor(avg_players_k),  # Labels are formatted by Plotly.js
+            texttemplate='%{text:,.0f}K',
             textposition='outside',
             hovertemplate='<b>%{x}</b><br>Avg Players: %{y:,}K<extra></extra>',
             marker_line_width=0
@@ -198,44 +287,10 @@ def show_top_trending_games(connection, selected_date, top_n=20):
     afternoon_start = 13
     afternoon_end = 23
     
-    # Fetch momentum data
-    momentum_query = """
-    WITH morning AS (
-        SELECT appid, AVG(median_playtime_2weeks) as avg_morning, MAX(name) as name
-        FROM games_cleaned
-        WHERE run_date = %s AND run_hour BETWEEN %s AND %s
-        GROUP BY appid
-    ),
-    afternoon AS (
-        SELECT appid, AVG(median_playtime_2weeks) as avg_afternoon
-        FROM games_cleaned
-        WHERE run_date = %s AND run_hour BETWEEN %s AND %s
-        GROUP BY appid
-    )
-    SELECT
-        m.appid,
-        m.name,
-        m.avg_morning,
-        COALESCE(a.avg_afternoon, 0) as avg_afternoon,
-        (a.avg_afternoon - m.avg_morning) as delta
-    FROM morning m
-    LEFT JOIN afternoon a ON m.appid = a.appid
-    ORDER BY delta DESC
-    """
-    
     try:
-        # # Debug: Print rendered query
-        # rendered_query = momentum_query % (
-        #     str(selected_date), morning_start, morning_end,
-        #     str(selected_date), afternoon_start, afternoon_end
-        # )
-        # with st.expander("📝 Debug: SQL Query"):
-        #     st.code(rendered_query, language="sql")
-        
-        momentum_df = pd.read_sql(
-            momentum_query,
-            connection,
-            params=(selected_date, morning_start, morning_end, selected_date, afternoon_start, afternoon_end)
+        # Fetch momentum data
+        momentum_df = fetch_game_momentum_data(
+            connection, selected_date, morning_start, morning_end, afternoon_start, afternoon_end
         )
         
         if momentum_df.empty:
@@ -245,23 +300,31 @@ def show_top_trending_games(connection, selected_date, top_n=20):
             momentum_df['delta'] = momentum_df['delta'].fillna(0)
             
             # Classify games by momentum
-            momentum_df['status'] = momentum_df['delta'].apply(
-                lambda x: '🚀 Rising' if pd.notna(x) and x > _RISING_THRESHOLD else '📉 Falling' if pd.notna(x) and x < _FALLING_THRESHOLD else '⚖️ Stable'
+            delta = momentum_df['delta'].to_numpy()
+            momentum_df['status'] = pd.Categorical(
+                np.select(
+                    [delta > _RISING_THRESHOLD, delta < _FALLING_THRESHOLD],
+                    ['🚀 Rising', '📉 Falling'],
+                    default='⚖️ Stable'
+                ),
+                categories=['🚀 Rising', '⚖️ Stable', '📉 Falling']
             )
             
-            # Get counts
-            rising = len(momentum_df[momentum_df['status'] == '🚀 Rising'])
-            falling = len(momentum_df[momentum_df['status'] == '📉 Falling'])
-            stable = len(momentum_df[momentum_df['status'] == '⚖️ Stable'])
+            # Split once by status; each tab reuses its slice
+            empty_games = momentum_df.iloc[:0]
+            momentum_groups = dict(list(momentum_df.groupby('status', sort=False, observed=True)))
+            rising_games = momentum_groups.get('🚀 Rising', empty_games)
+            stable_games = momentum_groups.get('⚖️ Stable', empty_games)
+            falling_games = momentum_groups.get('📉 Falling', empty_games)
             
             # Display summary metrics
             col1, col2, col3 = st.columns(3)
             with col1:
-                st.metric("🚀 Rising Games", rising)
+                st.metric("🚀 Rising Games", len(rising_games))
             with col2:
-                st.metric("⚖️ Stable Games", stable)
+                st.metric("⚖️ Stable Games", len(stable_games))
             with col3:
-                st.metric("📉 Falling Games", falling)
+                st.metric("📉 Falling Games", len(falling_games))
             
             st.markdown("---")
             
@@ -269,39 +332,12 @@ def show_top_trending_games(connection, selected_date, top_n=20):
             tab1, tab2, tab3 = st.tabs(["🚀 Rising", "⚖️ Stable", "📉 Falling"])
             
             with tab1:
-                rising_games = momentum_df[momentum_df['status'] == '🚀 Rising'].head(_TOTAL_GAMES_TO_DISPLAY)
-                if not rising_games.empty:
-                    rising_display = rising_games[['name', 'avg_morning', 'avg_afternoon', 'delta']].copy()
-                    rising_display.columns = ['Game Name', 'Morning (1-12h)', 'Afternoon (13-23h)', 'Delta']
-                    rising_display['Morning (1-12h)'] = rising_display['Morning (1-12h)'].apply(lambda x: f"{int(x):,}" if pd.notna(x) else "N/A")
-                    rising_display['Afternoon (13-23h)'] = rising_display['Afternoon (13-23h)'].apply(lambda x: f"{int(x):,}" if pd.notna(x) else "N/A")
-                    rising_display['Delta'] = rising_display['Delta'].apply(lambda x: f"+{int(x):,}" if pd.notna(x) else "N/A")
-                    st.dataframe(rising_display, use_container_width=True, hide_index=True)
-                else:
-                    st.info("No rising games in this period.")
+                _render_momentum_tab(rising_games.head(_TOTAL_GAMES_TO_DISPLAY), "+%d", "No rising games in this period.")
             
             with tab2:
-                stable_games = momentum_df[momentum_df['status'] == '⚖️ Stable'].head(_TOTAL_GAMES_TO_DISPLAY)
-                if not stable_games.empty:
-                    stable_display = stable_games[['name', 'avg_morning', 'avg_afternoon', 'delta']].copy()
-                    stable_display.columns = ['Game Name', 'Morning (1-12h)', 'Afternoon (13-23h)', 'Delta']
-                    stable_display['Morning (1-12h)'] = stable_display['Morning (1-12h)'].apply(lambda x: f"{int(x):,}" if pd.notna(x) else "N/A")
-                    stable_display['Afternoon (13-23h)'] = stable_display['Afternoon (13-23h)'].apply(lambda x: f"{int(x):,}" if pd.notna(x) else "N/A")
-                    stable_display['Delta'] = stable_display['Delta'].apply(lambda x: f"{int(x):,}" if pd.notna(x) else "N/A")
-                    st.dataframe(stable_display, use_container_width=True, hide_index=True)
-                else:
-                    st.info("No stable games in this period.")
+                _render_momentum_tab(stable_games.head(_TOTAL_GAMES_TO_DISPLAY), "%d", "No stable games in this period.")
             
             with tab3:
-                falling_games = momentum_df[momentum_df['status'] == '📉 Falling'].head(_TOTAL_GAMES_TO_DISPLAY)
-                if not falling_games.empty:
-                    falling_display = falling_games[['name', 'avg_morning', 'avg_afternoon', 'delta']].copy()
-                    falling_display.columns = ['Game Name', 'Morning (1-12h)', 'Afternoon (13-23h)', 'Delta']
-                    falling_display['Morning (1-12h)'] = falling_display['Morning (1-12h)'].apply(lambda x: f"{int(x):,}" if pd.notna(x) else "N/A")
-                    falling_display['Afternoon (13-23h)'] = falling_display['Afternoon (13-23h)'].apply(lambda x: f"{int(x):,}" if pd.notna(x) else "N/A")
-                    falling_display['Delta'] = falling_display['Delta'].apply(lambda x: f"{int(x):,}" if pd.notna(x) else "N/A")
-                    st.dataframe(falling_display, use_container_width=True, hide_index=True)
-                else:
-                    st.info("No falling games in this period.")
+                _render_momentum_tab(falling_games.head(_TOTAL_GAMES_TO_DISPLAY), "%d", "No falling games in this period.")
     except Exception as e:
         st.error(f"Error calculating momentum: {e}")
@@ -0,0 +1,58 @@
+import numpy as np
+import plotly.graph_objects as go
+
+
+def add_trend_traces(fig, x, y, header, fields, name, color, marker_size):
+    """
+    Add one game's trend line with typed customdata hover and N/A for missing values.
+
+    plotly.js formats a NaN (null) customdata cell as 0, and a per-point template array
+    would repeat the whole template for every point. Instead the line is drawn by one
+    hover-less WebGL trace, and the markers are split by which fields are missing: the
+    bulk of the points share one scalar template, and the few points with a missing
+    value (a game's first point, or a previous count of 0) get a small trace whose
+    template prints "<label>: N/A" for those fields. All traces share the legend entry.
+
+    Args:
+        fig: Figure to add the traces to
+        x: x values (NumPy array)
+        y: y values (float NumPy array)
+        header: Template text before the field lines (name, x and y lines)
+        fields: (values, label, placeholder) tuples; values is a float array and
+            placeholder formats column i of customdata, e.g. '%{customdata[0]:,.0f}K'
+        name: Legend name of the game
+        color: Line and marker color
+        marker_size: Marker size in px
+    """
+    fig.add_trace(go.Scattergl(
+        x=x,
+        y=y,
+        mode='lines',
+        name=name,
+        legendgroup=name,
+        line=dict(width=2, color=color),
+        hoverinfo='skip'
+    ))
+
+    customdata = np.column_stack([values for values, _, _ in fields])
+    # One bit per field that is NaN; points with the same pattern share a template
+    missing = np.isnan(customdata)
+    patterns = missing @ (1 << np.arange(len(fields)))
+
+    for pattern in np.unique(patterns):
+        points = patterns == pattern
+        lines = [
+            f"{label}: N/A" if pattern & (1 << i) else f"{label}: {placeholder}"
+            for i, (_, label, placeholder) in enumerate(fields)
+        ]
+        fig.add_trace(go.Scattergl(
+            x=x[points],
+            y=y[points],
+            mode='markers',
+            name=name,
+            legendgroup=name,
+            showlegend=False,
+            marker=dict(size=marker_size, color=color),
+            customdata=customdata[points],
+            hovertemplate=header + '<br>'.join(lines) + '<extra></extra>'
+        ))
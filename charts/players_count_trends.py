@@ -1,31 +1,41 @@
 import streamlit as st
 import pandas as pd
 import plotly.graph_objects as go
+from plotly.colors import qualitative
+import numpy as np
 import mysql.connector
 from mysql.connector import Error
+from db_connection import cache_by_run_date, fetch_dataframe
+from charts.downsample import lttb_indices
+from charts.hover import add_trend_traces
 
+# Traces longer than this are LTTB-downsampled before plotting (table keeps every row)
+_MAX_POINTS_PER_TRACE = 2000
 
-@st.cache_data(ttl=300)  # Cache for 5 minutes
-def fetch_top_20_games(_connection, run_date):
-    """Get top 20 games by total aggregated players for a specific date (skip hourly records)."""
+
+@cache_by_run_date
+def _fetch_game_maps(_connection, run_date):
+    # Top 20 games by total players, pre-aggregated per run_date by sql/mv_top_players_daily.sql
+    query = """
+    SELECT appid, name
+    FROM mv_top_players_daily
+    WHERE run_date = %s
+    ORDER BY total_players_k DESC
+    LIMIT 20
+    """
+    games = fetch_dataframe(_connection, query, (run_date,))
+    names = games['name'].tolist()
+    appids = games['appid'].tolist()
+    return dict(zip(names, appids)), dict(zip(appids, names)), sorted(names)
+
+
+def fetch_game_maps(connection, run_date):
+    """Get the (name -> appid, appid -> name, sorted names) lookups for the top 20 games of a date."""
     try:
-        query = """
-        SELECT 
-            pa.appid,
-            gc.name,
-            ROUND(SUM(pa.current_players) / 1000) as total_players_k
-        FROM player_count pa
-        LEFT JOIN games_cleaned gc ON pa.appid = gc.appid
-        WHERE pa.run_date = %s
-        GROUP BY pa.appid, gc.name
-        ORDER BY total_players_k DESC
-        LIMIT 20
-        """
-        result = pd.read_sql(query, _connection, params=(run_date,))
-        return result
+        return _fetch_game_maps(connection, run_date)
     except Error as e:
         st.error(f"Error fetching top 20 games: {e}")
-        return pd.DataFrame()
+        return {}, {}, []
 
 
 @st.cache_data(ttl=300)  # Cache for 5 minutes
@@ -38,18 +48,15 @@ def fetch_player_count_trends(_connection, appids):
         return pd.DataFrame()
     
     try:
-        # Convert list to comma-separated string for SQL IN clause
-        appids_str = ','.join(map(str, appids))
+        # One bound placeholder per appid for the SQL IN clause
+        placeholders = ','.join(['%s'] * len(appids))
         
+        # v_player_daily_totals is defined in sql/v_player_daily_totals.sql
         query = f"""
         WITH daily_totals AS (
-            SELECT
-                appid,
-                run_date,
-                ROUND(SUM(current_players) / 1000) AS players_k
-            FROM player_count
-            WHERE appid IN ({appids_str})
-            GROUP BY appid, run_date
+            SELECT appid, run_date, players_k
+            FROM v_player_daily_totals
+            WHERE appid IN ({placeholders})
         )
         SELECT
             appid,
@@ -66,7 +73,7 @@ def fetch_player_count_trends(_connection, appids):
         ORDER BY appid, run_date
         """
         
-        result = pd.read_sql(query, _connection)
+        result = fetch_dataframe(_connection, query, tuple(appids))
         return result
     except Error as e:
         st.error(f"Error fetching player count trends: {e}")
@@ -82,21 +89,33 @@ def show_players_count_trends(connection, selected_date):
         selected_date: The run_date to use for fetching top 20 games
     """
     
-    # Fetch top 20 games for the selected date
-    top_20_games = fetch_top_20_games(connection, selected_date)
+    # Game name <-> appid lookups for the top 20 games (cached alongside the query)
+    game_options, appid_to_name, game_names = fetch_game_maps(connection, selected_date)
     
-    if top_20_games.empty:
+    if not game_names:
         st.warning(f"⚠️ No data available for {selected_date}")
         return
     
-    # Create game name -> appid mapping
-    game_options = {row['name']: row['appid'] for _, row in top_20_games.iterrows()}
-    game_names = sorted(list(game_options.keys()))
-    
     # Display date info
     st.markdown(f"**📅 Date:** {selected_date.strftime('%Y-%m-%d')}")
     st.markdown("---")
     
+    # Only the fragment reruns when the game selection changes
+    _show_players_count_trends_fragment(connection, game_options, appid_to_name, game_names)
+
+
+@st.fragment
+def _show_players_count_trends_fragment(connection, game_options, appid_to_name, game_names):
+    """
+    Render the game picker, trend chart and data table as a partial-rerun fragment.
+    
+    Args:
+        connection: MySQL connection pool
+        game_options: Mapping of game name -> appid for the selected date
+        appid_to_name: Mapping of appid -> game name for the selected date
+        game_names: Sorted game names offered in the picker
+    """
+    
     # Multi-select for game filtering
     st.subheader("📊 Select Games to Display")
     selected_games = st.multiselect(
@@ -121,7 +140,6 @@ def show_players_count_trends(connection, selected_date):
         return
     
     # Add game names to the dataframe for display
-    appid_to_name = {v: k for k, v in game_options.items()}
     trend_data['game_name'] = trend_data['appid'].map(appid_to_name)
     
     # ===== CHART SECTION =====
@@ -131,27 +149,37 @@ def show_players_count_trends(connection, selected_date):
     # Create line chart
     fig = go.Figure()
     
-    # Add trace for each selected game
-    for appid in selected_appids:
+    # Add traces for each selected game (one color per game across its line and hover traces)
+    colors = qualitative.Plotly
+    for position, appid in enumerate(selected_appids):
         game_data = trend_data[trend_data['appid'] == appid].sort_values('run_date')
         game_name = appid_to_name[appid]
         
-        fig.add_trace(go.Scatter(
-            x=game_data['run_date'],
-            y=game_data['players_k'],
-            mode='lines+markers',
-            name=game_name,
-            hovertemplate=(
+        if len(game_data) > _MAX_POINTS_PER_TRACE:
+            dates = pd.to_datetime(game_data['run_date']).to_numpy(dtype='datetime64[ns]')
+            keep = lttb_indices(dates.view(np.int64), game_data['players_k'].to_numpy(), _MAX_POINTS_PER_TRACE)
+            game_data = game_data.iloc[keep]
+        
+        # WebGL traces: stay responsive with many games and long date ranges.
+        # Growth values are float (not int) so the first date's missing previous stays NaN.
+        add_trend_traces(
+            fig,
+            x=game_data['run_date'].to_numpy(),
+            y=game_data['players_k'].to_numpy(dtype=np.float32),
+            header=(
                 '<b>' + game_name + '</b><br>' +
                 'Date: %{x}<br>' +
-                'Total Players (K): %{y:,}K<br>' +
-                'Previous (K): ' + game_data['prev_players_k'].astype(str).str.replace('.0', '').replace('nan', 'N/A') + '<br>' +
-                'Change (K): ' + game_data['player_diff_k'].astype(str).str.replace('.0', '') + '<br>' +
-                '% Change: ' + game_data['pct_change'].astype(str) + '%<extra></extra>'
+                'Total Players (K): %{y:,}K<br>'
             ),
-            line=dict(width=2),
-            marker=dict(size=6)
-        ))
+            fields=[
+                (game_data['prev_players_k'].to_numpy(dtype=np.float32), 'Previous (K)', '%{customdata[0]:,.0f}K'),
+                (game_data['player_diff_k'].to_numpy(dtype=np.float32), 'Change (K)', '%{customdata[1]:+,.0f}K'),
+                (game_data['pct_change'].to_numpy(dtype=np.float32), '% Change', '%{customdata[2]:+.2f}%')
+            ],
+            name=game_name,
+            color=colors[position % len(colors)],
+            marker_size=6
+        )
     
     fig.update_layout(
         title=f"Players Count Trends - {len(selected_games)} Game(s)",
@@ -198,18 +226,15 @@ def show_players_count_trends(connection, selected_date):
     # Sort by game name and date
     display_table = display_table.sort_values(['Game Name', 'Date'], ascending=[True, False])
     
-    # Format columns for better readability
-    display_table['Total Players (K)'] = display_table['Total Players (K)'].apply(
-        lambda x: f"{int(x):,}K" if pd.notna(x) else "N/A"
-    )
-    display_table['Previous (K)'] = display_table['Previous (K)'].apply(
-        lambda x: f"{int(x):,}K" if pd.notna(x) else "N/A"
+    # Format columns in the browser; values stay numeric so the table sorts correctly
+    st.dataframe(
+        display_table,
+        use_container_width=True,
+        hide_index=True,
+        column_config={
+            'Total Players (K)': st.column_config.NumberColumn(format="%dK"),
+            'Previous (K)': st.column_config.NumberColumn(format="%dK"),
+            'Change (K)': st.column_config.NumberColumn(format="%+dK"),
+            '% Change': st.column_config.NumberColumn(format="%+.2f%%")
+        }
     )
-    display_table['Change (K)'] = display_table['Change (K)'].apply(
-        lambda x: f"{int(x):+,}K" if pd.notna(x) else "N/A"
-    )
-    display_table['% Change'] = display_table['% Change'].apply(
-        lambda x: f"{x:+.2f}%" if pd.notna(x) else "N/A"
-    )
-    
-    st.dataframe(display_table, use_container_width=True, hide_index=True)
@@ -1,28 +1,44 @@
 import streamlit as st
 import pandas as pd
 import plotly.graph_objects as go
+import plotly.io as pio
+from plotly.colors import qualitative
+import numpy as np
 import mysql.connector
 from mysql.connector import Error
+from db_connection import cache_by_run_date, fetch_dataframe
+from charts.downsample import lttb_indices
+from charts.hover import add_trend_traces
 
+# Traces longer than this are LTTB-downsampled before plotting (table keeps every row)
+_MAX_POINTS_PER_TRACE = 1500
 
-@st.cache_data(ttl=300)  # Cache for 5 minutes
-def fetch_all_games(_connection, run_date):
-    """Get all unique games for a specific date."""
+
+@cache_by_run_date
+def _fetch_game_maps(_connection, run_date):
+    # All unique games for the date
+    query = """
+    SELECT DISTINCT 
+        appid,
+        MAX(name) as name
+    FROM games_cleaned
+    WHERE run_date = %s
+    GROUP BY appid
+    ORDER BY appid
+    """
+    games = fetch_dataframe(_connection, query, (run_date,))
+    names = games['name'].tolist()
+    appids = games['appid'].tolist()
+    return dict(zip(names, appids)), dict(zip(appids, names)), sorted(names)
+
+
+def fetch_game_maps(connection, run_date):
+    """Get the (name -> appid, appid -> name, sorted names) lookups for a specific date."""
     try:
-        query = """
-        SELECT DISTINCT 
-            appid,
-            MAX(name) as name
-        FROM games_cleaned
-        WHERE run_date = %s
-        GROUP BY appid
-        ORDER BY appid
-        """
-        result = pd.read_sql(query, _connection, params=(run_date,))
-        return result
+        return _fetch_game_maps(connection, run_date)
     except Error as e:
         st.error(f"Error fetching games: {e}")
-        return pd.DataFrame()
+        return {}, {}, []
 
 
 @st.cache_data(ttl=300)  # Cache for 5 minutes
@@ -35,34 +51,133 @@ def fetch_player_count_trends_hourly(_connection, appids):
         return pd.DataFrame()
     
     try:
-        # Convert list to comma-separated string for SQL IN clause
-        appids_str = ','.join(map(str, appids))
+        # One bound placeholder per appid for the SQL IN clause
+        placeholders = ','.join(['%s'] * len(appids))
         
+        # LAG is evaluated once in the CTE; the growth metrics are derived from it
         query = f"""
+        WITH hourly AS (
+            SELECT
+                appid,
+                run_date,
+                run_hour,
+                current_players,
+                LAG(current_players) OVER w AS prev_players
+            FROM player_count
+            WHERE appid IN ({placeholders})
+            WINDOW w AS (PARTITION BY appid ORDER BY run_date, run_hour)
+        )
         SELECT
             appid,
             run_date,
             run_hour,
             current_players,
-            LAG(current_players) OVER (PARTITION BY appid ORDER BY run_date, run_hour) AS prev_players,
-            current_players - LAG(current_players) OVER (PARTITION BY appid ORDER BY run_date, run_hour) AS player_diff,
-            ROUND(
-                (current_players - LAG(current_players) OVER (PARTITION BY appid ORDER BY run_date, run_hour)) * 100.0 /
-                NULLIF(LAG(current_players) OVER (PARTITION BY appid ORDER BY run_date, run_hour), 0),
-                2
-            ) AS pct_change
-        FROM player_count
-        WHERE appid IN ({appids_str})
+            prev_players,
+            current_players - prev_players AS player_diff,
+            ROUND((current_players - prev_players) * 100.0 / NULLIF(prev_players, 0), 2) AS pct_change
+        FROM hourly
         ORDER BY appid, run_date, run_hour
         """
         
-        result = pd.read_sql(query, _connection)
-        return result
+        result = fetch_dataframe(_connection, query, tuple(appids))
+        # Nullable dtypes keep the gappy growth columns (the first hour has no LAG) as Int64
+        # instead of NaN-padded float64. pct_change is pinned to Float64, since
+        # convert_dtypes would make it Int64 whenever every value happens to be whole.
+        # Nullable NumPy dtypes (not pd.ArrowDtype) match the rest of the dashboard.
+        return result.convert_dtypes(convert_string=False).astype({'pct_change': 'Float64'})
     except Error as e:
         st.error(f"Error fetching hourly player count trends: {e}")
         return pd.DataFrame()
 
 
+@st.cache_data(ttl=300)  # Cache for 5 minutes
+def _build_hourly_figure(chart_data, selected_appids, appid_to_name):
+    """
+    Build the hourly trends line chart and return it serialized as Plotly JSON.
+    
+    Args:
+        chart_data: appid, datetime and player count columns of the hourly trend data
+        selected_appids: Appids in picker order (trace and legend order)
+        appid_to_name: Mapping of appid -> game name for the selected appids
+    """
+    
+    # Create line chart
+    fig = go.Figure()
+    
+    # Sort once and split by game in a single pass
+    games_data = dict(list(chart_data.sort_values(['appid', 'datetime']).groupby('appid', sort=False)))
+    
+    # Add traces for each selected game (in selection order, so the legend follows the picker)
+    colors = qualitative.Plotly
+    for position, appid in enumerate(selected_appids):
+        game_data = games_data.get(appid)
+        if game_data is None:
+            continue
+        game_name = appid_to_name[appid]
+        
+        if len(game_data) > _MAX_POINTS_PER_TRACE:
+            keep = lttb_indices(
+                game_data['datetime'].to_numpy(dtype='datetime64[ns]').view(np.int64),
+                game_data['current_players'].to_numpy(dtype=np.float64, na_value=np.nan),
+                _MAX_POINTS_PER_TRACE
+            )
+            game_data = game_data.iloc[keep]
+        
+        # WebGL traces (see charts/hover.py): stay responsive over many hourly buckets
+        add_trend_traces(
+            fig,
+            x=game_data['datetime'].to_numpy(),
+            y=game_data['current_players'].to_numpy(dtype=np.float32, na_value=np.nan),
+            header=(
+                '<b>' + game_name + '</b><br>' +
+                'Date: %{x|%Y-%m-%d %H:%M}<br>' +
+                'Players: %{y:,}<br>'
+            ),
+            fields=[
+                (game_data['prev_players'].to_numpy(dtype=np.float32, na_value=np.nan), 'Previous', '%{customdata[0]:,.0f}'),
+                (game_data['player_diff'].to_numpy(dtype=np.float32, na_value=np.nan), 'Change', '%{customdata[1]:+,.0f}'),
+                (game_data['pct_change'].to_numpy(dtype=np.float32, na_value=np.nan), '% Change', '%{customdata[2]:+.2f}%')
+            ],
+            name=game_name,
+            color=colors[position % len(colors)],
+            marker_size=5
+        )
+    
+    fig.update_layout(
+        title=f"Hourly Players Count Trends - {len(selected_appids)} Game(s)",
+        xaxis_title="DateTime (Hour)",
+        yaxis_title="Current Players",
+        height=500,
+        template="plotly_white",
+        hovermode='x unified',
+        plot_bgcolor='white',
+        paper_bgcolor='white',
+        font=dict(size=12, family="Arial, sans-serif", color='#000000'),
+        xaxis=dict(
+            tickfont=dict(size=11, color='#000000'),
+            title_font=dict(size=12, color='#000000')
+        ),
+        yaxis=dict(
+            tickfont=dict(size=11, color='#000000'),
+            title_font=dict(size=12, color='#000000')
+        ),
+        title_font=dict(size=16, color='#000000'),
+        legend=dict(
+            orientation="v",
+            yanchor="top",
+            y=0.99,
+            xanchor="left",
+            x=0.01,
+            bgcolor="rgba(255, 255, 255, 0.8)",
+            bordercolor="black",
+            borderwidth=1
+        ),
+        margin=dict(b=80, l=80, r=80, t=80)
+    )
+    
+    return fig.to_json()
+
+
 def show_player_count_trends_hourly(connection, selected_date):
     """
     Display the Hourly Player count Trends dashboard.
@@ -72,17 +187,13 @@ def show_player_count_trends_hourly(connection, selected_date):
         selected_date: The run_date to use for fetching top 20 games
     """
     
-    # Fetch all games for the selected date
-    all_games = fetch_all_games(connection, selected_date)
+    # Game name <-> appid lookups for the selected date (cached alongside the query)
+    game_options, appid_to_name, game_names = fetch_game_maps(connection, selected_date)
     
-    if all_games.empty:
+    if not game_names:
         st.warning(f"⚠️ No data available for {selected_date}")
         return
     
-    # Create game name -> appid mapping
-    game_options = {row['name']: row['appid'] for _, row in all_games.iterrows()}
-    game_names = sorted(list(game_options.keys()))
-    
     # Display date info
     st.markdown(f"**📅 Date:** {selected_date.strftime('%Y-%m-%d')}")
     st.markdown("---")
@@ -105,79 +216,30 @@ def show_player_count_trends_hourly(connection, selected_date):
     selected_appids = [game_options[game] for game in selected_games]
     
     # Fetch trend data for selected games
-    trend_data = fetch_player_count_trends_hourly(connection, selected_appids)
+    # Canonical (sorted, de-duplicated) appids so reordering the picker reuses the cache
+    trend_data = fetch_player_count_trends_hourly(connection, tuple(sorted(set(selected_appids))))
     
     if trend_data.empty:
         st.warning("No trend data available for selected games.")
         return
     
     # Add game names to the dataframe for display
-    appid_to_name = {v: k for k, v in game_options.items()}
     trend_data['game_name'] = trend_data['appid'].map(appid_to_name)
     
     # Create datetime column combining run_date and run_hour
-    trend_data['datetime'] = pd.to_datetime(trend_data['run_date'].astype(str) + ' ' + trend_data['run_hour'].astype(str).str.zfill(2) + ':00:00')
+    trend_data['datetime'] = pd.to_datetime(trend_data['run_date']) + pd.to_timedelta(trend_data['run_hour'].astype('int64'), unit='h')
     
     # ===== CHART SECTION =====
     st.markdown("---")
     st.header("📈 Hourly Players Count Trends")
     
-    # Create line chart
-    fig = go.Figure()
-    
-    # Add trace for each selected game
-    for appid in selected_appids:
-        game_data = trend_data[trend_data['appid'] == appid].sort_values('datetime')
-        game_name = appid_to_name[appid]
-        
-        fig.add_trace(go.Scatter(
-            x=game_data['datetime'],
-            y=game_data['current_players'],
-            mode='lines+markers',
-            name=game_name,
-            hovertemplate=(
-                '<b>' + game_name + '</b><br>' +
-                'Date: %{x|%Y-%m-%d %H:%M}<br>' +
-                'Players: %{y:,}<br>' +
-                'Previous: ' + game_data['prev_players'].astype(str).str.replace('.0', '').replace('nan', 'N/A') + '<br>' +
-                'Change: ' + game_data['player_diff'].astype(str).str.replace('.0', '') + '<br>' +
-                '% Change: ' + game_data['pct_change'].astype(str) + '%<extra></extra>'
-            ),
-            line=dict(width=2),
-            marker=dict(size=5)
-        ))
-    
-    fig.update_layout(
-        title=f"Hourly Players Count Trends - {len(selected_games)} Game(s)",
-        xaxis_title="DateTime (Hour)",
-        yaxis_title="Current Players",
-        height=500,
-        template="plotly_white",
-        hovermode='x unified',
-        plot_bgcolor='white',
-        paper_bgcolor='white',
-        font=dict(size=12, family="Arial, sans-serif", color='#000000'),
-        xaxis=dict(
-            tickfont=dict(size=11, color='#000000'),
-            title_font=dict(size=12, color='#000000')
-        ),
-        yaxis=dict(
-            tickfont=dict(size=11, color='#000000'),
-            title_font=dict(size=12, color='#000000')
-        ),
-        title_font=dict(size=16, color='#000000'),
-        legend=dict(
-            orientation="v",
-            yanchor="top",
-            y=0.99,
-            xanchor="left",
-            x=0.01,
-            bgcolor="rgba(255, 255, 255, 0.8)",
-            bordercolor="black",
-            borderwidth=1
-        ),
-        margin=dict(b=80, l=80, r=80, t=80)
-    )
+    # Figure is cached as JSON; reruns from other widgets skip LTTB and trace building
+    chart_columns = ['appid', 'datetime', 'current_players', 'prev_players', 'player_diff', 'pct_change']
+    fig = pio.from_json(_build_hourly_figure(
+        trend_data[chart_columns],
+        tuple(selected_appids),
+        {appid: appid_to_name[appid] for appid in selected_appids}
+    ))
     
     st.plotly_chart(fig, use_container_width=True)
     
@@ -192,19 +254,16 @@ def show_player_count_trends_hourly(connection, selected_date):
     # Sort by game name, date, and hour
     display_table = display_table.sort_values(['Game Name', 'Date', 'Hour'], ascending=[True, False, False])
     
-    # Format columns for better readability
-    display_table['Hour'] = display_table['Hour'].apply(lambda x: f"{int(x):02d}:00")
-    display_table['Current Players'] = display_table['Current Players'].apply(
-        lambda x: f"{int(x):,}" if pd.notna(x) else "N/A"
-    )
-    display_table['Previous Players'] = display_table['Previous Players'].apply(
-        lambda x: f"{int(x):,}" if pd.notna(x) else "N/A"
+    # Numeric columns (including Hour) are formatted in the browser and keep their dtypes
+    st.dataframe(
+        display_table,
+        use_container_width=True,
+        hide_index=True,
+        column_config={
+            'Hour': st.column_config.NumberColumn(format="%02d:00"),
+            'Current Players': st.column_config.NumberColumn(format="%d"),
+            'Previous Players': st.column_config.NumberColumn(format="%d"),
+            'Difference': st.column_config.NumberColumn(format="%+d"),
+            '% Change': st.column_config.NumberColumn(format="%+.2f%%")
+        }
     )
-    display_table['Difference'] = display_table['Difference'].apply(
-        lambda x: f"{int(x):+,}" if pd.notna(x) else "N/A"
-    )
-    display_table['% Change'] = display_table['% Change'].apply(
-        lambda x: f"{x:+.2f}%" if pd.notna(x) else "N/A"
-    )
-    
-    st.dataframe(display_table, use_container_width=True, hide_index=True)
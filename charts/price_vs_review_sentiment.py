@@ -3,30 +3,40 @@ import pandas as pd
 import plotly.graph_objects as go
 import mysql.connector
 from mysql.connector import Error
+from db_connection import cache_by_run_date, fetch_dataframe
 import numpy as np
 
 
-@st.cache_data(ttl=300)  # Cache for 5 minutes
-def fetch_price_sentiment_data(_connection, run_date):
+@cache_by_run_date
+def _fetch_price_sentiment_data(_connection, run_date):
+    query = """
+    SELECT
+        appid,
+        MAX(name) as name,
+        MAX(price_usd) as price_usd,
+        SUM(positive_reviews) as positive_reviews,
+        SUM(negative_reviews) as negative_reviews,
+        MAX(current_players) as current_players,
+        SUM(positive_reviews) + SUM(negative_reviews) as total_reviews,
+        ROUND(
+            SUM(positive_reviews) * 100.0 / NULLIF(SUM(positive_reviews) + SUM(negative_reviews), 0),
+            1
+        ) as sentiment_pct
+    FROM games_cleaned
+    WHERE run_date = %s
+        AND price_usd > 0
+    GROUP BY appid
+    HAVING total_reviews >= 10
+    ORDER BY price_usd DESC
+    """
+    result = fetch_dataframe(_connection, query, (run_date,))
+    return result
+
+
+def fetch_price_sentiment_data(connection, run_date):
     """Fetch price vs review sentiment data for a specific date."""
     try:
-        query = """
-        SELECT
-            appid,
-            MAX(name) as name,
-            MAX(price_usd) as price_usd,
-            SUM(positive_reviews) as positive_reviews,
-            SUM(negative_reviews) as negative_reviews,
-            MAX(current_players) as current_players
-        FROM games_cleaned
-        WHERE run_date = %s
-            AND price_usd > 0
-        GROUP BY appid
-        HAVING (SUM(positive_reviews) + SUM(negative_reviews)) >= 10
-        ORDER BY price_usd DESC
-        """
-        result = pd.read_sql(query, _connection, params=(run_date,))
-        return result
+        return _fetch_price_sentiment_data(connection, run_date)
     except Error as e:
         st.error(f"Error fetching price sentiment data: {e}")
         return pd.DataFrame()
@@ -52,10 +62,6 @@ def show_price_vs_review_sentiment(connection, selected_date):
     st.markdown(f"**📅 Date:** {selected_date.strftime('%Y-%m-%d')}")
     st.markdown("---")
     
-    # Calculate sentiment metrics
-    data['total_reviews'] = data['positive_reviews'] + data['negative_reviews']
-    data['sentiment_pct'] = (data['positive_reviews'] / data['total_reviews'] * 100).round(1)
-    
     # ===== ANALYSIS DESCRIPTION =====
     st.info(
         """
@@ -91,15 +97,21 @@ def show_price_vs_review_sentiment(connection, selected_date):
     # ===== SCATTER PLOT SECTION =====
     st.header("💰⭐ Price vs Review Sentiment")
     
-    # Create scatter plot
+    # Hover counts travel as one numeric array and are formatted by Plotly.js on mouseover
+    hover_data = data[['positive_reviews', 'negative_reviews', 'total_reviews', 'current_players']].to_numpy(dtype=np.float64)
+    
+    # Logarithmic scale for bubble size, clamped to 5-25px
+    bubble_size = np.clip(5.0 + np.log1p(data['total_reviews'].to_numpy(dtype=np.float64)), 5, 25)
+    
+    # Create scatter plot (WebGL; past ~1M points rasterize server-side with datashader instead)
     fig = go.Figure()
     
-    fig.add_trace(go.Scatter(
+    fig.add_trace(go.Scattergl(
         x=data['price_usd'],
         y=data['sentiment_pct'],
         mode='markers',
         marker=dict(
-            size=data['total_reviews'].apply(lambda x: max(5, min(25, 5 + np.log1p(x)))),  # Logarithmic scale for bubble size
+            size=bubble_size,
             color=data['sentiment_pct'],
             colorscale='RdYlGn',  # Red (bad) to Yellow (ok) to Green (good)
             showscale=True,
@@ -107,22 +119,17 @@ def show_price_vs_review_sentiment(connection, selected_date):
             line=dict(width=1, color='white'),
             opacity=0.8
         ),
-        text=[
-            f"<b>{name}</b><br>" +
-            f"Price: ${price:.2f}<br>" +
-            f"Sentiment: {sentiment:.1f}%<br>" +
-            f"Positive Reviews: {pos:,}<br>" +
-            f"Negative Reviews: {neg:,}<br>" +
-            f"Total Reviews: {total:,}<br>" +
-            f"Current Players: {players:,}"
-            for name, price, sentiment, pos, neg, total, players
-            in zip(
-                data['name'], data['price_usd'], data['sentiment_pct'],
-                data['positive_reviews'], data['negative_reviews'],
-                data['total_reviews'], data['current_players']
-            )
-        ],
-        hovertemplate='%{text}<extra></extra>',
+        text=data['name'],
+        customdata=hover_data,
+        hovertemplate=(
+            '<b>%{text}</b><br>' +
+            'Price: $%{x:.2f}<br>' +
+            'Sentiment: %{y:.1f}%<br>' +
+            'Positive Reviews: %{customdata[0]:,.0f}<br>' +
+            'Negative Reviews: %{customdata[1]:,.0f}<br>' +
+            'Total Reviews: %{customdata[2]:,.0f}<br>' +
+            'Current Players: %{customdata[3]:,.0f}<extra></extra>'
+        ),
         name='Games'
     ))
     
@@ -162,21 +169,18 @@ def show_price_vs_review_sentiment(connection, selected_date):
     avg_sentiment = data['sentiment_pct'].mean()
     avg_price = data['price_usd'].mean()
     
+    # Both quartiles of each column in one selection pass (plain NumPy: the frame holds one
+    # row per paid game, so a Polars round-trip per rerun is unlikely to pay off)
+    sentiment = data['sentiment_pct'].to_numpy(dtype=np.float64)
+    price = data['price_usd'].to_numpy(dtype=np.float64)
+    sentiment_q1, sentiment_q3 = np.quantile(sentiment, [0.25, 0.75])
+    price_q1, price_q3 = np.quantile(price, [0.25, 0.75])
+    
     # Identify bargains (high sentiment + low price)
-    bargain_threshold_sentiment = data['sentiment_pct'].quantile(0.75)
-    bargain_threshold_price = data['price_usd'].quantile(0.25)
-    bargains = data[
-        (data['sentiment_pct'] >= bargain_threshold_sentiment) &
-        (data['price_usd'] <= bargain_threshold_price)
-    ]
+    bargains = data[(sentiment >= sentiment_q3) & (price <= price_q1)]
     
     # Identify overpriced (low sentiment + high price)
-    overpriced_threshold_sentiment = data['sentiment_pct'].quantile(0.25)
-    overpriced_threshold_price = data['price_usd'].quantile(0.75)
-    overpriced = data[
-        (data['sentiment_pct'] <= overpriced_threshold_sentiment) &
-        (data['price_usd'] >= overpriced_threshold_price)
-    ]
+    overpriced = data[(sentiment <= sentiment_q1) & (price >= price_q3)]
     
     # Display metrics
     col1, col2, col3, col4 = st.columns(4)
@@ -192,17 +196,21 @@ def show_price_vs_review_sentiment(connection, selected_date):
     
     st.markdown("---")
     
+    # Both tables stay numeric; Streamlit formats (and sorts) the values in the browser
+    table_columns = ['name', 'price_usd', 'sentiment_pct', 'total_reviews']
+    table_column_config = {
+        'name': st.column_config.TextColumn("Game Name"),
+        'price_usd': st.column_config.NumberColumn("Price", format="$%.2f"),
+        'sentiment_pct': st.column_config.NumberColumn("Sentiment %", format="%.1f%%"),
+        'total_reviews': st.column_config.NumberColumn("Total Reviews", format="%d")
+    }
+    
     # Bargain games section
     st.subheader("🎁 Bargain Picks")
     st.caption("Games in top 25% sentiment with prices in bottom 25% - exceptional value recommendations")
     if not bargains.empty:
-        bargain_display = bargains[['name', 'price_usd', 'sentiment_pct', 'total_reviews']].copy()
-        bargain_display = bargain_display.sort_values('sentiment_pct', ascending=False).head(10)
-        bargain_display.columns = ['Game Name', 'Price', 'Sentiment %', 'Total Reviews']
-        bargain_display['Price'] = bargain_display['Price'].apply(lambda x: f"${x:.2f}")
-        bargain_display['Sentiment %'] = bargain_display['Sentiment %'].apply(lambda x: f"{x:.1f}%")
-        bargain_display['Total Reviews'] = bargain_display['Total Reviews'].apply(lambda x: f"{int(x):,}")
-        st.dataframe(bargain_display, use_container_width=True, hide_index=True)
+        bargain_display = bargains[table_columns].nlargest(10, 'sentiment_pct')
+        st.dataframe(bargain_display, use_container_width=True, hide_index=True, column_config=table_column_config)
     else:
         st.info("No bargain picks found in current data.")
     
@@ -212,12 +220,7 @@ def show_price_vs_review_sentiment(connection, selected_date):
     st.subheader("⚠️ Potentially Overpriced")
     st.caption("Games in bottom 25% sentiment with prices in top 25% - may indicate poor value for money")
     if not overpriced.empty:
-        overpriced_display = overpriced[['name', 'price_usd', 'sentiment_pct', 'total_reviews']].copy()
-        overpriced_display = overpriced_display.sort_values('price_usd', ascending=False).head(10)
-        overpriced_display.columns = ['Game Name', 'Price', 'Sentiment %', 'Total Reviews']
-        overpriced_display['Price'] = overpriced_display['Price'].apply(lambda x: f"${x:.2f}")
-        overpriced_display['Sentiment %'] = overpriced_display['Sentiment %'].apply(lambda x: f"{x:.1f}%")
-        overpriced_display['Total Reviews'] = overpriced_display['Total Reviews'].apply(lambda x: f"{int(x):,}")
-        st.dataframe(overpriced_display, use_container_width=True, hide_index=True)
+        overpriced_display = overpriced[table_columns].nlargest(10, 'price_usd')
+        st.dataframe(overpriced_display, use_container_width=True, hide_index=True, column_config=table_column_config)
     else:
         st.info("No overpriced games found in current data.")
@@ -1,12 +1,11 @@
 import streamlit as st
-import pandas as pd
 from mysql.connector import Error
 from charts.fetch_top_trending_games import show_top_trending_games
 from charts.players_count_trends import show_players_count_trends
 from charts.players_count_trends_hourly import show_player_count_trends_hourly
 from charts.price_vs_review_sentiment import show_price_vs_review_sentiment
 from charts.developer_performance import show_developer_performance
-from db_connection import get_db_connection
+from db_connection import fetch_dataframe, get_db_connection
 
 # Page configuration
 st.set_page_config(
@@ -23,7 +22,7 @@ def fetch_available_dates(_connection):
     """Get all available run_dates, sorted newest first."""
     try:
         query = "SELECT DISTINCT run_date FROM games_cleaned ORDER BY run_date DESC"
-        result = pd.read_sql(query, _connection)
+        result = fetch_dataframe(_connection, query)
         return result['run_date'].tolist() if not result.empty else []
     except Error as e:
         st.error(f"Error fetching dates: {e}")
@@ -32,15 +31,15 @@ def fetch_available_dates(_connection):
 
 # ===== PAGE LAYOUT =====
 
-# Get database connection
-connection = get_db_connection()
+# Get database connection pool
+pool = get_db_connection()
 
-if connection is None:
+if pool is None:
     st.error("❌ Failed to connect to database. Please check MySQL is running.")
     st.stop()
 
 # Fetch available dates
-available_dates = fetch_available_dates(connection)
+available_dates = fetch_available_dates(pool)
 
 if not available_dates:
     st.error("❌ No data available in database.")
@@ -97,19 +96,19 @@ with st.sidebar:
 chart_key = chart_options[selected_chart]
 
 if chart_key == "top_trending_games":
-    show_top_trending_games(connection, selected_date, top_n)
+    show_top_trending_games(pool, selected_date, top_n)
 
 elif chart_key == "players_count_trends":
-    show_players_count_trends(connection, selected_date)
+    show_players_count_trends(pool, selected_date)
 
 elif chart_key == "players_count_trends_hourly":
-    show_player_count_trends_hourly(connection, selected_date)
+    show_player_count_trends_hourly(pool, selected_date)
 
 elif chart_key == "price_vs_review_sentiment":
-    show_price_vs_review_sentiment(connection, selected_date)
+    show_price_vs_review_sentiment(pool, selected_date)
 
 elif chart_key == "developer_performance":
-    show_developer_performance(connection, selected_date)
+    show_developer_performance(pool, selected_date)
 
 elif chart_key == "owners_vs_active_players_ratio":
     st.info("⭐ Analysis coming soon...")
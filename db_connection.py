@@ -1,5 +1,10 @@
+import functools
+from datetime import date, timedelta
+
 import mysql.connector
 from mysql.connector import Error
+from mysql.connector.errors import PoolError
+from mysql.connector.pooling import MySQLConnectionPool
 import pandas as pd
 import streamlit as st
 
@@ -8,38 +13,167 @@ DB_CONFIG = {
     'host': 'localhost',
     'user': 'root',
     'password': '',
-    'database': 'steam_games'
+    'database': 'steam_games',
+    # Each SELECT commits on its own; otherwise the first read on a pooled connection
+    # opens a REPEATABLE READ transaction and later reads see its stale snapshot
+    'autocommit': True
 }
 
+# games_cleaned columns read by the dashboard; wide descriptive columns are never fetched
+GAMES_CLEANED_COLUMNS = [
+    'appid', 'name', 'run_date', 'run_hour',
+    'current_players', 'price_usd',
+    'positive_reviews', 'negative_reviews',
+    'median_playtime_2weeks', 'average_playtime_forever'
+]
+
 @st.cache_resource
 def get_db_connection():
-    """Create and return a MySQL database connection."""
+    """
+    Create and return a shared MySQL connection pool.
+
+    Each query leases its own connection (see fetch_dataframe), so sessions and tabs
+    don't serialize on one handle, and a leased connection that the server dropped
+    (wait_timeout) is reconnected by the pool. The per-lease session reset is skipped:
+    DB_CONFIG's autocommit means no transaction (and no read snapshot) outlives a query,
+    and the dashboard sets no session variables.
+    """
     try:
-        connection = mysql.connector.connect(**DB_CONFIG)
-        return connection
+        return MySQLConnectionPool(
+            pool_name="steam_games",
+            pool_size=8,
+            pool_reset_session=False,
+            **DB_CONFIG
+        )
     except Error as e:
         st.error(f"Error connecting to MySQL: {e}")
         return None
 
-def fetch_games_cleaned(connection, run_date=None):
-    """Fetch data from games_cleaned table."""
+def fetch_dataframe(connection, query, params=None, categories=()):
+    """
+    Run a SELECT on a plain DBAPI cursor and build a DataFrame from the result.
+
+    Bypasses pd.read_sql's per-row fallback path for non-SQLAlchemy connections.
+    Integer columns are downcast to the smallest dtype that holds them, and the
+    label columns named in ``categories`` are dictionary-encoded as categoricals.
+    ``connection`` may be the pool from get_db_connection, in which case a
+    connection is leased for this query and returned to the pool afterwards; if
+    every pooled connection is busy, a one-off connection is opened instead.
+    """
+    pool = connection if isinstance(connection, MySQLConnectionPool) else None
+    if pool is not None:
+        connection = _lease_connection(pool)
+    try:
+        cursor = connection.cursor()
+        try:
+            cursor.execute(query, params)
+            rows = cursor.fetchall()
+            columns = cursor.column_names
+        finally:
+            cursor.close()
+    finally:
+        if pool is not None:
+            connection.close()  # Returns a pooled connection to the pool
+
+    df = pd.DataFrame.from_records(rows, columns=columns, coerce_float=True)
+    for column in df.select_dtypes(include='integer').columns:
+        df[column] = pd.to_numeric(df[column], downcast='integer')
+    for column in categories:
+        df[column] = df[column].astype('category')
+    return df
+
+def _lease_connection(pool):
+    """Lease a pooled connection, or open a one-off connection if every pooled one is busy."""
+    try:
+        return pool.get_connection()
+    except PoolError:
+        return mysql.connector.connect(**DB_CONFIG)
+
+# A run_date is treated as immutable once it is this many days old: late hours loaded
+# after midnight and the per-date rollup refreshes have landed by then
+SETTLED_AFTER_DAYS = 2
+
+class _UnsettledResult(Exception):
+    """Raised inside the persisted cache so an empty or partial result is never written to disk."""
+
+def _is_empty_result(result):
+    """
+    True for an empty frame or collection, and for a tuple/dict result that holds an
+    empty frame or is empty throughout (e.g. lookups built from an empty query).
+    """
+    if isinstance(result, pd.DataFrame):
+        return result.empty
+    if isinstance(result, (tuple, dict)):
+        parts = list(result.values()) if isinstance(result, dict) else list(result)
+        if any(isinstance(part, pd.DataFrame) and part.empty for part in parts):
+            return True
+        return all(_is_empty_result(part) for part in parts)
+    try:
+        return len(result) == 0
+    except TypeError:
+        return result is None
+
+def cache_by_run_date(func):
+    """
+    Cache a query function whose first two arguments are (_connection, run_date).
+
+    Settled run_dates (older than SETTLED_AFTER_DAYS) are immutable, so their results
+    are persisted to disk with no TTL and survive server restarts. Recent run_dates may
+    still be loading or waiting for a rollup refresh and keep the 5-minute in-memory
+    cache, as does any empty result, so a date that is not loaded yet is re-checked.
+    Database errors must propagate out of ``func`` (catch them in the caller) so that
+    a failed fetch is never persisted.
+    """
+    live = st.cache_data(ttl=300)(func)
+
+    # A distinct qualname gives the persisted cache its own key in Streamlit
+    # Fetches through the TTL cache, so an empty result (which is not persisted) is
+    # queried at most once per 5 minutes instead of on every rerun
+    @functools.wraps(func)
+    def historical_func(*args, **kwargs):
+        result = live(*args, **kwargs)
+        if _is_empty_result(result):
+            raise _UnsettledResult()  # Exceptions are not cached
+        return result
+    historical_func.__qualname__ = f"{func.__qualname__}_historical"
+    historical = st.cache_data(persist="disk", max_entries=512)(historical_func)
+
+    @functools.wraps(func)
+    def wrapper(_connection, run_date, *args, **kwargs):
+        if run_date < date.today() - timedelta(days=SETTLED_AFTER_DAYS):
+            try:
+                return historical(_connection, run_date, *args, **kwargs)
+            except _UnsettledResult:
+                pass
+        return live(_connection, run_date, *args, **kwargs)
+
+    return wrapper
+
+def fetch_games_cleaned(connection, run_date=None, cols=None):
+    """Fetch data from games_cleaned table (only ``cols``, default GAMES_CLEANED_COLUMNS)."""
     try:
-        query = "SELECT * FROM games_cleaned"
+        query = f"SELECT {_select_list(cols)} FROM games_cleaned"
+        params = None
         if run_date:
-            query += f" WHERE run_date = '{run_date}'"
+            query += " WHERE run_date = %s"
+            params = (run_date,)
         query += " ORDER BY current_players DESC"
 
-        df = pd.read_sql(query, connection)
+        df = fetch_dataframe(connection, query, params)
         return df
     except Error as e:
         st.error(f"Error fetching games_cleaned data: {e}")
         return pd.DataFrame()
 
+def _select_list(cols):
+    """Build a SELECT column list, backtick-quoting each column name."""
+    return ', '.join(f"`{col}`" for col in (cols or GAMES_CLEANED_COLUMNS))
+
 def fetch_latest_run_date(connection):
     """Get the latest run_date from the database."""
     try:
         query = "SELECT DISTINCT run_date FROM games_cleaned ORDER BY run_date DESC LIMIT 1"
-        result = pd.read_sql(query, connection)
+        result = fetch_dataframe(connection, query)
         if not result.empty:
             return result.iloc[0]['run_date']
         return None
@@ -51,7 +185,7 @@ def fetch_available_dates(connection):
     """Get all available run_dates for filtering."""
     try:
         query = "SELECT DISTINCT run_date FROM games_cleaned ORDER BY run_date DESC"
-        result = pd.read_sql(query, connection)
+        result = fetch_dataframe(connection, query)
         return result['run_date'].tolist() if not result.empty else []
     except Error as e:
         st.error(f"Error fetching available dates: {e}")
@@ -60,14 +194,14 @@ def fetch_available_dates(connection):
 def fetch_player_count_trend(connection, appid, days=30):
     """Fetch player activity trend for a specific game."""
     try:
-        query = f"""
+        query = """
         SELECT run_date, current_players, appid 
         FROM games_cleaned 
-        WHERE appid = {appid} 
-        AND run_date >= DATE_SUB(CURDATE(), INTERVAL {days} DAY)
+        WHERE appid = %s 
+        AND run_date >= DATE_SUB(CURDATE(), INTERVAL %s DAY)
         ORDER BY run_date ASC
         """
-        df = pd.read_sql(query, connection)
+        df = fetch_dataframe(connection, query, (appid, days))
         return df
     except Error as e:
         st.error(f"Error fetching player activity trend: {e}")
@@ -77,12 +211,12 @@ def fetch_game_details(connection, appid):
     """Fetch detailed information for a specific game."""
     try:
         query = f"""
-        SELECT * FROM games_cleaned 
-        WHERE appid = {appid} 
+        SELECT {_select_list(GAMES_CLEANED_COLUMNS)} FROM games_cleaned 
+        WHERE appid = %s 
         ORDER BY run_date DESC 
         LIMIT 1
         """
-        df = pd.read_sql(query, connection)
+        df = fetch_dataframe(connection, query, (appid,))
         return df
     except Error as e:
         st.error(f"Error fetching game details: {e}")
@@ -92,9 +226,11 @@ def get_summary_stats(connection, run_date=None):
     """Get summary statistics for the dashboard."""
     try:
         if run_date:
-            where_clause = f"WHERE run_date = '{run_date}'"
+            where_clause = "WHERE run_date = %s"
+            params = (run_date,)
         else:
             where_clause = ""
+            params = None
 
         query = f"""
         SELECT 
@@ -108,7 +244,7 @@ def get_summary_stats(connection, run_date=None):
         {where_clause}
         """
 
-        result = pd.read_sql(query, connection)
+        result = fetch_dataframe(connection, query, params)
         return result.iloc[0].to_dict() if not result.empty else {}
     except Error as e:
         st.error(f"Error fetching summary stats: {e}")
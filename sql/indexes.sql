@@ -0,0 +1,11 @@
+-- Secondary indexes for the dashboard queries. Run once:
+--   mysql -u root steam_games < sql/indexes.sql
+
+-- Game Momentum Analysis: range scan on (run_date, run_hour) reading playtime from the index
+ALTER TABLE games_cleaned ADD INDEX idx_mom (run_date, run_hour, appid, median_playtime_2weeks);
+
+-- Top Trending Games: per-date player averages
+ALTER TABLE games_cleaned ADD INDEX idx_run_date_players (run_date, current_players);
+
+-- mv_top_players_daily refresh: per-date player sums
+ALTER TABLE player_count ADD INDEX idx_run_date_appid_players (run_date, appid, current_players);
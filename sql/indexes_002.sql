@@ -0,0 +1,15 @@
+-- Second batch of secondary indexes (added after sql/indexes.sql). Run once:
+--   mysql -u root steam_games < sql/indexes_002.sql
+--
+-- Check that the hourly LAG window no longer sorts: the player_count row of
+--   EXPLAIN SELECT appid, run_date, run_hour, LAG(current_players) OVER w
+--   FROM player_count WHERE appid IN (730, 570)
+--   WINDOW w AS (PARTITION BY appid ORDER BY run_date, run_hour);
+-- should use idx_pc_appid_date_hour (range, "Using index") with no "Using filesort".
+
+-- Hourly Players Count Trends: LAG window reads each appid's partition in (run_date, run_hour) order
+ALTER TABLE player_count ADD INDEX idx_pc_appid_date_hour (appid, run_date, run_hour, current_players);
+
+-- Hourly game list and Price vs Review Sentiment: per-date GROUP BY appid, covered by the index
+-- (InnoDB has no INCLUDE clause, so the read columns are trailing key parts)
+ALTER TABLE games_cleaned ADD INDEX idx_gc_rundate_appid (run_date, appid, price_usd, positive_reviews, negative_reviews, current_players, name);
@@ -0,0 +1,48 @@
+-- Per-developer daily rollup backing the Developer Performance chart.
+-- Refresh once per run_date after games_cleaned has been loaded, e.g.:
+--   mysql -u root steam_games -e "SET @run_date = '2024-01-31'; SOURCE sql/mv_developer_daily.sql;"
+-- Backfill every run_date already in games_cleaned (e.g. right after deploying):
+--   mysql -u root steam_games -e "SET @backfill = 1; SOURCE sql/mv_developer_daily.sql;"
+
+CREATE TABLE IF NOT EXISTS mv_developer_daily (
+    run_date DATE NOT NULL,
+    developer VARCHAR(255) NOT NULL,
+    total_players BIGINT NOT NULL,
+    game_count INT NOT NULL,
+    avg_price DECIMAL(10, 2),
+    positive_sum BIGINT,
+    negative_sum BIGINT,
+    PRIMARY KEY (run_date, developer),
+    KEY idx_run_date_players (run_date, total_players DESC)
+);
+
+-- @backfill is NULL unless set, so a plain refresh only touches @run_date
+DELETE FROM mv_developer_daily WHERE @backfill = 1 OR run_date = @run_date;
+
+INSERT INTO mv_developer_daily
+    (run_date, developer, total_players, game_count, avg_price, positive_sum, negative_sum)
+SELECT
+    d.run_date,
+    CASE
+        WHEN gc.appid = 1938090 THEN 'Infinity Ward'
+        ELSE gc.developer
+    END as developer,
+    SUM(g.current_players) as total_players,
+    COUNT(DISTINCT gc.appid) as game_count,
+    ROUND(AVG(gc.price), 2) as avg_price,
+    SUM(g.positive_reviews) as positive_sum,
+    SUM(g.negative_reviews) as negative_sum
+FROM (
+    SELECT DISTINCT run_date
+    FROM games_cleaned
+    WHERE @backfill = 1 OR run_date = @run_date
+) d
+CROSS JOIN game_catalog gc
+LEFT JOIN games_cleaned g ON gc.appid = g.appid AND g.run_date = d.run_date
+WHERE gc.developer IS NOT NULL AND gc.developer != ''
+GROUP BY d.run_date,
+         CASE
+            WHEN gc.appid = 1938090 THEN 'Infinity Ward'
+            ELSE gc.developer
+         END
+HAVING SUM(g.current_players) > 0;
@@ -0,0 +1,37 @@
+-- Per-game daily player totals backing the Players Count Trends game picker.
+-- Refresh once per run_date after player_count has been loaded, e.g.:
+--   mysql -u root steam_games -e "SET @run_date = '2024-01-31'; SOURCE sql/mv_top_players_daily.sql;"
+-- Backfill every run_date already in player_count (e.g. right after deploying):
+--   mysql -u root steam_games -e "SET @backfill = 1; SOURCE sql/mv_top_players_daily.sql;"
+
+CREATE TABLE IF NOT EXISTS mv_top_players_daily (
+    run_date DATE NOT NULL,
+    appid INT NOT NULL,
+    name VARCHAR(255),
+    total_players_k INT NOT NULL,
+    PRIMARY KEY (run_date, appid),
+    KEY idx_date_rank (run_date, total_players_k DESC)
+);
+
+-- @backfill is NULL unless set, so a plain refresh only touches @run_date
+DELETE FROM mv_top_players_daily WHERE @backfill = 1 OR run_date = @run_date;
+
+-- Names are resolved once per appid so the join does not fan out the hourly sums
+INSERT INTO mv_top_players_daily (run_date, appid, name, total_players_k)
+SELECT
+    pa.run_date,
+    pa.appid,
+    gc.name,
+    ROUND(SUM(pa.current_players) / 1000) as total_players_k
+FROM (
+    SELECT DISTINCT run_date
+    FROM player_count
+    WHERE @backfill = 1 OR run_date = @run_date
+) d
+JOIN player_count pa ON pa.run_date = d.run_date
+LEFT JOIN (
+    SELECT appid, MAX(name) as name
+    FROM games_cleaned
+    GROUP BY appid
+) gc ON pa.appid = gc.appid
+GROUP BY pa.run_date, pa.appid, gc.name;
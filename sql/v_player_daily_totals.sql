@@ -0,0 +1,16 @@
+-- Daily player totals (in thousands) per game, used by the Players Count Trends chart.
+-- A plain view: create it once, no per-run_date refresh needed.
+--   mysql -u root steam_games < sql/v_player_daily_totals.sql
+--
+-- Requires MySQL 8.0.22+: the GROUP BY makes this a materialized (TEMPTABLE) view, and
+-- only from 8.0.22 does derived-condition pushdown move the caller's `appid IN (...)`
+-- filter inside the GROUP BY. On older 8.0.x every query materializes the view over the
+-- whole player_count table.
+
+CREATE OR REPLACE VIEW v_player_daily_totals AS
+SELECT
+    appid,
+    run_date,
+    ROUND(SUM(current_players) / 1000) AS players_k
+FROM player_count
+GROUP BY appid, run_date;